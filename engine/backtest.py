@@ -0,0 +1,166 @@
+from typing import Callable, Sequence
+
+from engine.kernels import EXIT_NONE, entry_order, exit_action, close_pnl
+from engine.strategy_ema import EmaState, on_price
+from engine.strategy_trend import TrendPullbackState, make_on_candle
+
+
+def run(
+    prices: Sequence[float],
+    alpha_fast: float,
+    alpha_slow: float,
+    risk_frac: float,
+    stop_frac: float,
+    rr_takeprofit: float,
+    max_hold: int,
+    max_trades: int,
+    max_daily_loss_frac: float,
+    initial_equity: float,
+    day_idx: Sequence[int]
+) -> tuple[list[float], list[tuple]]:
+    """
+    Replays the ema_cross strategy + risk gates + exits of the live loop over a price series.
+    Uses strategy_ema.on_price itself, like the live loop.
+    risk_frac / stop_frac / max_daily_loss_frac are fractions (0.01 = 1%), as in EngineConfig.
+    day_idx[i] = UTC day of prices[i] (for daily counters / loss limit).
+    Returns: (equity_curve, trades), see _replay.
+    """
+    stop_long_mult = 1.0 - stop_frac
+    stop_short_mult = 1.0 + stop_frac
+    state = EmaState()
+
+    def step(i: int) -> tuple[int, float]:
+        nonlocal state
+        p = prices[i]
+        state, signal = on_price(state, p, alpha_fast, alpha_slow)
+        if signal == "long":
+            return 1, p * stop_long_mult
+        if signal == "short":
+            return -1, p * stop_short_mult
+        return 0, 0.0
+
+    return _replay(
+        prices, step, risk_frac, rr_takeprofit, max_hold, max_trades, max_daily_loss_frac, initial_equity, day_idx
+    )
+
+
+def run_trend(
+    candles: Sequence[tuple],  # marketdata.Candle
+    ema_trend: int,
+    ema_fast: int,
+    ema_slow: int,
+    pullback_band_pct: float,
+    swing_lookback: int,
+    risk_frac: float,
+    rr_takeprofit: float,
+    max_hold: int,
+    max_trades: int,
+    max_daily_loss_frac: float,
+    initial_equity: float,
+    day_idx: Sequence[int]
+) -> tuple[list[float], list[tuple]]:
+    """
+    Replays the trend_pullback strategy (stop at swing low/high) like run() does for ema_cross.
+    Uses the same strategy_trend.make_on_candle step as the live loop, so signals are identical.
+    """
+    state = TrendPullbackState()
+    trend_step = make_on_candle(ema_trend, ema_fast, ema_slow, pullback_band_pct, swing_lookback)
+
+    def step(i: int) -> tuple[int, float]:
+        nonlocal state
+        _, o, h, l, c, _, _ = candles[i]
+        state, signal, info = trend_step(state, o, h, l, c)
+        if signal == "long":
+            return 1, info["swing_low"]
+        if signal == "short":
+            return -1, info["swing_high"]
+        return 0, 0.0
+
+    closes = [c[4] for c in candles]  # Candle: (open_time, open, high, low, close, volume, close_time)
+    return _replay(
+        closes, step, risk_frac, rr_takeprofit, max_hold, max_trades, max_daily_loss_frac, initial_equity, day_idx
+    )
+
+
+def _replay(
+    prices: Sequence[float],
+    step: Callable[[int], tuple[int, float]],
+    risk_frac: float,
+    rr_takeprofit: float,
+    max_hold: int,
+    max_trades: int,
+    max_daily_loss_frac: float,
+    initial_equity: float,
+    day_idx: Sequence[int]
+) -> tuple[list[float], list[tuple]]:
+    """
+    Risk gates + entries + exits of the live loop on scalars (no EngineState/Position objects).
+    step(i) updates the strategy with bar i and returns (signal, stop_price); signal 1 / -1 / 0.
+    Like the live loop, step is not called on bars skipped by the loss limit or the
+    max-trades gate (while flat).
+    Returns: (equity_curve, trades)
+      equity_curve[i] = equity after bar i
+      trades = [(entry_idx, exit_idx, side, entry_price, exit_price, size, pnl, exit_reason)]
+               side: 1 = long, -1 = short; exit_reason: index into kernels.EXIT_REASONS
+    """
+    n = len(prices)
+    equity_curve = [0.0] * n
+    trades = []
+
+    equity = initial_equity
+    day = day_idx[0] if n else 0
+    day_start_equity = equity
+    daily_pnl = 0.0
+    daily_loss_limit = -max_daily_loss_frac * day_start_equity
+    trades_today = 0
+
+    # Position als Skalare; pos_side == 0 -> keine Position
+    pos_side = 0
+    entry_idx = 0
+    entry_price = size = stop_price = tp_price = 0.0
+    hold = 0
+
+    for i in range(n):
+        p = prices[i]
+
+        if day_idx[i] != day:
+            day = day_idx[i]
+            trades_today = 0
+            day_start_equity = equity
+            daily_pnl = 0.0
+            daily_loss_limit = -max_daily_loss_frac * day_start_equity
+
+        if daily_pnl <= daily_loss_limit or (trades_today >= max_trades and pos_side == 0):
+            equity_curve[i] = equity
+            continue
+
+        sig, stop = step(i)
+
+        # Entry
+        if pos_side == 0 and sig != 0:
+            new_size, new_tp = entry_order(p, stop, equity, risk_frac, rr_takeprofit)
+            if new_size > 0:
+                pos_side = sig
+                entry_idx = i
+                entry_price = p
+                size = new_size
+                stop_price = stop
+                tp_price = new_tp
+                trades_today += 1
+                hold = 0
+
+        # Exits: TP/SL, danach Zeit
+        if pos_side != 0:
+            hold += 1
+            reason = exit_action(pos_side, p, tp_price, stop_price, hold, max_hold)
+            if reason != EXIT_NONE:
+                pnl = close_pnl(pos_side, entry_price, p, size)
+                equity += pnl
+                daily_pnl = equity - day_start_equity
+                trades.append((entry_idx, i, pos_side, entry_price, p, size, pnl, reason))
+                pos_side = 0
+                hold = 0
+
+        equity_curve[i] = equity
+
+    return equity_curve, trades
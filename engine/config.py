@@ -0,0 +1,142 @@
+import json
+from dataclasses import dataclass, field
+
+from engine.strategy_ema import ema_alpha
+
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20}
+LOG_FORMATS = ("jsonl", "msgpack")  # main.LOG_PATHS
+FEEDS = ("rest", "ws")
+
+# Aenderungen an diesen Feldern greifen erst nach einem Neustart (kein Hot-Reload)
+RESTART_ONLY_FIELDS = (
+    "mode",
+    "symbols",
+    "feed",
+    "log_format",
+    "strategy.name",
+    "strategy.use_candles",
+    "strategy.candle_interval",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class StrategyConfig:
+    name: str = "ema_cross"
+    use_candles: bool = False
+    candle_interval: str = "1m"
+    warmup_candles: int = 0
+    rr_takeprofit: float = 2.0
+    max_hold_candles: int = 12
+
+    # trend_pullback
+    ema_trend: int = 200
+    ema_pullback_fast: int = 20
+    ema_pullback_slow: int = 50
+    pullback_band_pct: float = 0.0015
+    swing_lookback: int = 5
+
+    # ema_cross
+    ema_fast: int = 12
+    ema_slow: int = 26
+    stop_loss_pct: float = 1.0
+
+    # abgeleitet (einmal beim Laden berechnet)
+    alpha_fast: float = field(init=False)
+    alpha_slow: float = field(init=False)
+    stop_long_mult: float = field(init=False)
+    stop_short_mult: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        stop_frac = self.stop_loss_pct / 100.0
+        object.__setattr__(self, "alpha_fast", ema_alpha(self.ema_fast))
+        object.__setattr__(self, "alpha_slow", ema_alpha(self.ema_slow))
+        object.__setattr__(self, "stop_long_mult", 1.0 - stop_frac)
+        object.__setattr__(self, "stop_short_mult", 1.0 + stop_frac)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "StrategyConfig":
+        return cls(
+            name=str(d.get("name", "ema_cross")),
+            use_candles=bool(d.get("use_candles", False)),
+            candle_interval=str(d.get("candle_interval", "1m")),
+            warmup_candles=int(d.get("warmup_candles", 0)),
+            rr_takeprofit=float(d.get("rr_takeprofit", 2.0)),
+            max_hold_candles=int(d.get("max_hold_candles", 12)),
+            ema_trend=int(d.get("ema_trend", 200)),
+            ema_pullback_fast=int(d.get("ema_pullback_fast", 20)),
+            ema_pullback_slow=int(d.get("ema_pullback_slow", 50)),
+            pullback_band_pct=float(d.get("pullback_band_pct", 0.0015)),
+            swing_lookback=int(d.get("swing_lookback", 5)),
+            ema_fast=int(d.get("ema_fast", 12)),
+            ema_slow=int(d.get("ema_slow", 26)),
+            stop_loss_pct=float(d.get("stop_loss_pct", 1.0)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EngineConfig:
+    mode: str
+    symbols: tuple[str, ...]
+    interval_sec: int
+    max_trades_per_day: int
+    feed: str = "rest"
+    trade_enabled: bool = False
+    log_level: str = "INFO"
+    log_format: str = "jsonl"
+    initial_equity: float = 100.0
+    risk_per_trade_pct: float = 1.0
+    max_daily_loss_pct: float = 5.0
+    backtest_candles: int = 1000
+    strategy: StrategyConfig = field(default_factory=StrategyConfig)
+
+    # abgeleitet (einmal beim Laden berechnet)
+    risk_frac: float = field(init=False)
+    max_daily_loss_frac: float = field(init=False)
+    debug: bool = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "risk_frac", self.risk_per_trade_pct / 100.0)
+        object.__setattr__(self, "max_daily_loss_frac", self.max_daily_loss_pct / 100.0)
+        object.__setattr__(self, "debug", LOG_LEVELS[self.log_level] <= LOG_LEVELS["DEBUG"])
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EngineConfig":
+        return cls(
+            mode=str(d["mode"]),
+            symbols=tuple(d["symbols"]),
+            interval_sec=int(d["interval_sec"]),
+            max_trades_per_day=int(d["max_trades_per_day"]),
+            feed=_choice("feed", str(d.get("feed", "rest")), FEEDS),
+            trade_enabled=bool(d.get("trade_enabled", False)),
+            log_level=_choice("log_level", str(d.get("log_level", "INFO")).upper(), LOG_LEVELS),
+            log_format=_choice("log_format", str(d.get("log_format", "jsonl")), LOG_FORMATS),
+            initial_equity=float(d.get("initial_equity", 100.0)),
+            risk_per_trade_pct=float(d.get("risk_per_trade_pct", 1.0)),
+            max_daily_loss_pct=float(d.get("max_daily_loss_pct", 5.0)),
+            backtest_candles=int(d.get("backtest_candles", 1000)),
+            strategy=StrategyConfig.from_dict(d.get("strategy", {})),
+        )
+
+
+def _choice(name: str, value: str, allowed) -> str:
+    """value if it is one of `allowed`, else a ValueError naming the allowed values."""
+    if value not in allowed:
+        raise ValueError(f"{name} must be one of {', '.join(allowed)}, got {value!r}")
+    return value
+
+
+def load_config(path: str) -> EngineConfig:
+    with open(path, "r", encoding="utf-8") as f:
+        return EngineConfig.from_dict(json.load(f))
+
+
+def restart_only_changes(old: EngineConfig, new: EngineConfig) -> list[str]:
+    """Fields from RESTART_ONLY_FIELDS that differ between two configs."""
+    changed = []
+    for path in RESTART_ONLY_FIELDS:
+        a, b = old, new
+        for name in path.split("."):
+            a, b = getattr(a, name), getattr(b, name)
+        if a != b:
+            changed.append(path)
+    return changed
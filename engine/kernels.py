@@ -0,0 +1,48 @@
+# Reine Skalar-Arithmetik, gemeinsam fuer Live-Loop und Backtest (keine Objekte, kein I/O)
+
+# Exit-Codes (Index in EXIT_REASONS), EXIT_NONE -> Position bleibt offen
+EXIT_NONE = -1
+EXIT_TAKE_PROFIT = 0
+EXIT_STOP_LOSS = 1
+EXIT_TIME = 2
+EXIT_REASONS = ("take_profit", "stop_loss", "time_exit")
+
+
+def entry_order(
+    price: float,
+    stop_price: float,
+    equity: float,
+    risk_frac: float,
+    rr_takeprofit: float
+) -> tuple[float, float]:
+    """
+    Sizing + take profit for a new position at `price` (long and short, the sign
+    follows from stop_price). Returns (size, take_profit_price); size 0.0 -> bad stop distance.
+    """
+    stop_distance = abs(price - stop_price)
+    if stop_distance <= 0:
+        return 0.0, 0.0
+    return equity * risk_frac / stop_distance, price + rr_takeprofit * (price - stop_price)
+
+
+def exit_action(
+    side_sign: int,
+    price: float,
+    take_profit_price: float,
+    stop_price: float,
+    hold: int,
+    max_hold: int
+) -> int:
+    """Exit ladder: TP, then SL, then time. Returns an EXIT_* code."""
+    if side_sign * (price - take_profit_price) >= 0:
+        return EXIT_TAKE_PROFIT
+    if side_sign * (stop_price - price) >= 0:
+        return EXIT_STOP_LOSS
+    if hold >= max_hold:
+        return EXIT_TIME
+    return EXIT_NONE
+
+
+def close_pnl(side_sign: int, entry_price: float, exit_price: float, size: float) -> float:
+    """PnL of closing `size` units opened at entry_price; side_sign +1 long / -1 short."""
+    return side_sign * (exit_price - entry_price) * size
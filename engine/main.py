@@ -1,227 +1,520 @@
+import atexit
+import queue
+import threading
 import time
 import json
 import os
-from datetime import datetime, timezone
-from engine.strategy_ema import EmaState, on_price
-from engine.state import new_state, utc_day, Position
-from engine.marketdata import get_binance_price
-from engine.marketdata import get_binance_price, get_binance_last_closed_candle
-from engine.strategy_trend import TrendPullbackState, on_candle
+from dataclasses import asdict
+from functools import partial
+from engine.strategy_ema import EmaState, on_price, ema_cross_batch
+from engine.state import new_state, utc_day, candle_day, day_iso, next_utc_midnight_ns, EngineState, Position
+from engine.marketdata import interval_ms, get_binance_price, get_binance_last_closed_candle, get_binance_closed_candles
+from engine.strategy_trend import TrendPullbackState, make_on_candle, warmup as trend_warmup
+from engine import backtest
+from engine.kernels import EXIT_NONE, EXIT_REASONS, entry_order, exit_action, close_pnl
+from engine.config import StrategyConfig, load_config, restart_only_changes
+
+try:
+    import orjson
+    # Newline im selben C-Aufruf anhaengen -> kein zweites bytes-Objekt pro Event
+    _encode_jsonl = partial(orjson.dumps, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:  # stdlib fallback, same output as before
+    def _encode_jsonl(event: dict) -> bytes:
+        return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
 
 CONFIG_PATH = "config/settings.json"
-
-def load_config():
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def log_event(event: dict) -> None:
-    os.makedirs("logs", exist_ok=True)
-    event["ts"] = datetime.now(timezone.utc).isoformat()
-    with open("logs/engine.log", "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+LOG_PATHS = {
+    "jsonl": "logs/engine.log",
+    "msgpack": "logs/engine.mp",  # 4-byte LE length + MessagePack per event, see scripts/dump_log.py
+}
+
+TICK_LOG_EVERY = 60  # bei INFO nur jeden N-ten Tick loggen (Heartbeat)
+CANDLE_CLOSE_GRACE_SEC = 0.75  # REST-Kerzen: so lange nach dem Close warten, bis Binance sie liefert
+
+# Log-Writer-Thread: Tick-Thread serialisiert und reiht ein, der Writer haelt die Datei
+# offen und flusht erst wenn die Queue leer ist (Ende eines Batches)
+LOG_QUEUE_SIZE = 8192
+LOG_CLOSE_TIMEOUT_SEC = 5.0  # close_log wartet hoechstens so lange auf Queue/Writer
+
+_LOG_Q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_LOG_THREAD: threading.Thread | None = None
+_LOG_ERROR: Exception | None = None  # Schreibfehler des Writers, wird in log_event geworfen
+
+_encode = _encode_jsonl
+
+def open_log(fmt: str = "jsonl") -> None:
+    global _LOG_THREAD, _encode
+    if fmt == "msgpack":
+        import msgpack
+        packb = msgpack.packb
+
+        def _encode_msgpack(event: dict) -> bytes:
+            payload = packb(event, use_bin_type=True)
+            return len(payload).to_bytes(4, "little") + payload
+
+        _encode = _encode_msgpack
+    else:
+        _encode = _encode_jsonl
+
+    # einziges mkdir: einmal beim Start, nicht pro Event
+    path = LOG_PATHS[fmt]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fh = open(path, "ab", buffering=1 << 16)
+    _LOG_THREAD = threading.Thread(target=_drain_log, args=(fh,), name="log-writer", daemon=True)
+    _LOG_THREAD.start()
+    atexit.register(close_log)
+
+def _drain_log(fh) -> None:
+    global _LOG_ERROR
+    try:
+        while True:
+            record = _LOG_Q.get()
+            if record is None:  # close_log()
+                break
+            fh.write(record)
+            if _LOG_Q.empty():  # end of batch
+                fh.flush()
+    except Exception as e:  # ENOSPC, EIO, ...
+        _LOG_ERROR = e
+        # Queue leeren, damit ein blockiertes put() im Tick-Thread zurueckkehrt
+        try:
+            while True:
+                _LOG_Q.get_nowait()
+        except queue.Empty:
+            pass
+    finally:
+        try:
+            fh.close()
+        except OSError:
+            pass
+
+def close_log() -> None:
+    global _LOG_THREAD
+    if _LOG_THREAD is None:
+        return
+    try:
+        _LOG_Q.put(None, timeout=LOG_CLOSE_TIMEOUT_SEC)
+    except queue.Full:  # Writer kommt nicht hinterher / haengt
+        pass
+    _LOG_THREAD.join(LOG_CLOSE_TIMEOUT_SEC)
+    _LOG_THREAD = None
+
+def _iso_now(ns: int | None = None) -> str:
+    """UTC ISO-8601 timestamp (like datetime.isoformat()) without building a datetime object."""
+    if ns is None:
+        ns = time.time_ns()
+    s, rem = divmod(ns, 1_000_000_000)
+    t = time.gmtime(s)
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.{rem // 1000:06d}+00:00"
+    )
+
+def log_event(event: dict, ts: str | None = None) -> None:
+    event["ts"] = ts if ts is not None else _iso_now()
+    if _LOG_ERROR is not None:  # Writer ist tot -> Fehler im Tick-Thread sichtbar machen
+        raise _LOG_ERROR
+    # sofort serialisieren: Event-Templates werden im naechsten Tick wiederverwendet
+    _LOG_Q.put(_encode(event))
+
+def _close_position(state: EngineState, price: float, reason: str, ts: str) -> None:
+    pos = state.position
+    pnl = close_pnl(pos.side_sign, pos.entry_price, price, pos.size)
+
+    state.equity += pnl
+    state.daily_pnl = state.equity - state.day_start_equity
+
+    log_event({
+        "type": "position_closed",
+        "symbol": pos.symbol,
+        "side": pos.side,
+        "opened_at": _iso_now(pos.opened_at),
+        "entry_price": pos.entry_price,
+        "exit_price": price,
+        "size": pos.size,
+        "stop_price": pos.stop_price,
+        "take_profit_price": pos.take_profit_price,
+        "pnl": pnl,
+        "equity_after": state.equity,
+        "daily_pnl": state.daily_pnl,
+        "reason": reason
+    }, ts=ts)
+
+    state.position = None
+
+def _make_trend_step(scfg: StrategyConfig):
+    """trend_pullback on_candle specialized for the current strategy params (neu bei Reload)."""
+    return make_on_candle(
+        ema_trend=scfg.ema_trend,
+        ema_fast=scfg.ema_pullback_fast,
+        ema_slow=scfg.ema_pullback_slow,
+        pullback_band_pct=scfg.pullback_band_pct,
+        swing_lookback=scfg.swing_lookback
+    )
 
 def main():
-    config = load_config()
-    symbol = config["symbols"][0]
-    interval = int(config["interval_sec"])
-
-    initial_equity = float(config.get("initial_equity", 100.0))
-    state = new_state(initial_equity)
-
+    cfg = load_config(CONFIG_PATH)
+    cfg_mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    scfg = cfg.strategy
+    symbol = cfg.symbols[0]
+    state = new_state(cfg.initial_equity)
 
-    strat_cfg = config.get("strategy", {})
-    strategy_name = str(strat_cfg.get("name", "ema_cross"))
-
-    ema_trend = int(strat_cfg.get("ema_trend", 200))
-    ema_fast_pb = int(strat_cfg.get("ema_pullback_fast", 20))
-    ema_slow_pb = int(strat_cfg.get("ema_pullback_slow", 50))
-    pullback_band_pct = float(strat_cfg.get("pullback_band_pct", 0.0015))
-    swing_lookback = int(strat_cfg.get("swing_lookback", 5))
-    rr_takeprofit = float(strat_cfg.get("rr_takeprofit", 2.0))
-
-    ema_fast = int(strat_cfg.get("ema_fast", 12))
-    ema_slow = int(strat_cfg.get("ema_slow", 26))
-    max_hold_candles = int(strat_cfg.get("max_hold_candles", 12))
     hold_candles = 0
     trend_state = TrendPullbackState()
-
-    use_candles = bool(strat_cfg.get("use_candles", False))
-    candle_interval = str(strat_cfg.get("candle_interval", "1m"))
+    strat_state = EmaState()
     last_candle_close_time = None
 
+    open_log(cfg.log_format)
+    log_event({"type": "startup", "config": asdict(cfg)})
+
+    # Backtest: historische Kerzen in einem Durchlauf replayen, Logs erst danach schreiben
+    if cfg.mode == "backtest":
+        history = get_binance_closed_candles(symbol, scfg.candle_interval, cfg.backtest_candles)
+        day_idx = [candle_day(c.close_time) for c in history]
+        if scfg.name == "trend_pullback":
+            equity_curve, trades = backtest.run_trend(
+                history,
+                scfg.ema_trend,
+                scfg.ema_pullback_fast,
+                scfg.ema_pullback_slow,
+                scfg.pullback_band_pct,
+                scfg.swing_lookback,
+                cfg.risk_frac,
+                scfg.rr_takeprofit,
+                scfg.max_hold_candles,
+                cfg.max_trades_per_day,
+                cfg.max_daily_loss_frac,
+                cfg.initial_equity,
+                day_idx
+            )
+        else:
+            equity_curve, trades = backtest.run(
+                [c.close for c in history],
+                scfg.alpha_fast,
+                scfg.alpha_slow,
+                cfg.risk_frac,
+                scfg.stop_loss_pct / 100.0,
+                scfg.rr_takeprofit,
+                scfg.max_hold_candles,
+                cfg.max_trades_per_day,
+                cfg.max_daily_loss_frac,
+                cfg.initial_equity,
+                day_idx
+            )
+        for entry_idx, exit_idx, side, entry_price, exit_price, size, pnl, reason in trades:
+            log_event({
+                "type": "backtest_trade",
+                "symbol": symbol,
+                "side": "long" if side == 1 else "short",
+                "entry_time": history[entry_idx].close_time,
+                "exit_time": history[exit_idx].close_time,
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "size": size,
+                "pnl": pnl,
+                "reason": EXIT_REASONS[reason]
+            })
+        log_event({
+            "type": "backtest_done",
+            "symbol": symbol,
+            "interval": scfg.candle_interval,
+            "candles": len(history),
+            "trades": len(trades),
+            "equity_start": cfg.initial_equity,
+            "equity_end": equity_curve[-1] if equity_curve else cfg.initial_equity
+        })
+        return
+
+    # Warmup: EMAs aus historischen Kerzen in einem Rutsch statt Tick fuer Tick
+    if scfg.warmup_candles > 0 and scfg.use_candles:
+        try:
+            history = get_binance_closed_candles(symbol, scfg.candle_interval, scfg.warmup_candles)
+            if scfg.name == "trend_pullback":
+                trend_state = trend_warmup(
+                    trend_state,
+                    history,
+                    ema_trend=scfg.ema_trend,
+                    ema_fast=scfg.ema_pullback_fast,
+                    ema_slow=scfg.ema_pullback_slow,
+                    swing_lookback=scfg.swing_lookback
+                )
+                warm = {"ema_fast": trend_state.ema20, "ema_slow": trend_state.ema50, "ema_trend": trend_state.ema200}
+            else:
+                ema_cross_batch([c.close for c in history], scfg.alpha_fast, scfg.alpha_slow, strat_state)
+                warm = {"ema_fast": strat_state.ema_fast, "ema_slow": strat_state.ema_slow}
+            if history:
+                last_candle_close_time = history[-1].close_time
+            log_event({
+                "type": "warmup_ok",
+                "strategy": scfg.name,
+                "candles": len(history),
+                **warm
+            })
+        except Exception as e:
+            log_event({
+                "type": "warmup_error",
+                "strategy": scfg.name,
+                "error": str(e)
+            })
+
+    # "rest" = pollen alle interval_sec, "ws" = Binance WebSocket (push); erst nach Backtest-Zweig
+    # und Warmup, damit keine waehrend des Warmup-Fetches geschlossene Kerze doppelt ankommt
+    feed = None
+    if cfg.feed == "ws":
+        from engine.ws_feed import BinanceFeed
+        feed = BinanceFeed(symbol, scfg.candle_interval if scfg.use_candles else None).start()
+
+    # Templates fuer die haeufigen Events: pro Tick nur Werte setzen statt neue dicts
+    # zu bauen. Sicher, weil log_event sofort serialisiert und keine Referenz behaelt.
+    tick_evt = {
+        "type": "tick",
+        "counter": 0,
+        "symbol": symbol,
+        "mode": cfg.mode,
+        "price": 0.0,
+        "candle_interval": scfg.candle_interval if scfg.use_candles else None,
+        "trades_today": 0,
+        "has_position": False,
+        "equity": 0.0,
+        "daily_pnl": 0.0,
+        "ts": None
+    }
+    marketdata_evt = {"type": "marketdata_ok", "symbol": symbol, "price": 0.0, "ts": None}
+    trend_evt = {
+        "type": "strategy_state",
+        "strategy": "trend_pullback",
+        "ema_fast": None,
+        "ema_slow": None,
+        "ema_trend": None,
+        "signal": None,
+        "swing_low": None,
+        "swing_high": None,
+        "touch_fast": None,
+        "touch_slow": None,
+        "ts": None
+    }
+    ema_evt = {"type": "strategy_state", "strategy": "ema_cross", "ema_fast": None, "ema_slow": None, "signal": None, "ts": None}
+
+    # Strategiewahl ist restart-only -> einmal entscheiden statt String-Vergleich pro Tick
+    use_trend = scfg.name == "trend_pullback"
+    trend_step = _make_trend_step(scfg)
+
+    # REST-Kerzen: bis zum naechsten Kerzen-Close schlafen statt alle interval_sec zu pollen
+    candle_ms = interval_ms(scfg.candle_interval) if scfg.use_candles and feed is None else None
+
+    # Tageswechsel nur per Integer-Vergleich pruefen; Limit aendert sich nur beim Rollover
+    next_day_ns = next_utc_midnight_ns()
+    daily_loss_limit = -cfg.max_daily_loss_frac * state.day_start_equity
 
-    log_event({"type": "startup", "config": config})
     last_candle = None
     counter = 0
+    had_position = False  # Tick-Log bei Positionswechsel
+    sleep = time.sleep
+    deadline = time.monotonic()
+    waited = False  # letzte Iteration hat schon auf den WS-Kerzen-Feed gewartet
     while True:
+        # Scheduler: feste Periode (nicht interval + Arbeitszeit), genau eine Sleep-Stelle.
+        # Verpasste Ticks werden uebersprungen statt nachgeholt.
+        now_mono = time.monotonic()
+        if waited or deadline <= now_mono:
+            deadline = now_mono
+        else:
+            sleep(deadline - now_mono)
+        deadline += cfg.interval_sec
+        waited = False
+
         counter += 1
+        now_ns = time.time_ns()
+        now_iso = _iso_now(now_ns)  # ein Timestamp pro Tick
+
+        # Config-Reload: ein stat() pro Tick, geparst wird nur wenn die Datei sich geaendert hat
+        try:
+            mtime = os.stat(CONFIG_PATH).st_mtime_ns
+        except OSError:
+            mtime = cfg_mtime
+        if mtime != cfg_mtime:
+            cfg_mtime = mtime
+            try:
+                new_cfg = load_config(CONFIG_PATH)
+                restart_only = restart_only_changes(cfg, new_cfg)
+            except Exception as e:
+                log_event({
+                    "type": "config_reload_error",
+                    "error": str(e)
+                }, ts=now_iso)
+            else:
+                if restart_only:
+                    log_event({
+                        "type": "config_reload_skipped",
+                        "reason": "restart_required",
+                        "fields": restart_only
+                    }, ts=now_iso)
+                else:
+                    cfg = new_cfg
+                    scfg = cfg.strategy
+                    trend_step = _make_trend_step(scfg)
+                    daily_loss_limit = -cfg.max_daily_loss_frac * state.day_start_equity
+                    log_event({"type": "config_reloaded", "config": asdict(cfg)}, ts=now_iso)
 
         # Tageswechsel UTC -> trade counter reset
-        today = utc_day()
-        if today != state.day_utc:
-            log_event({
-            "type": "day_rollover",
-            "from": state.day_utc,
-            "to": today
-            })
-            state.day_utc = today
-            state.trades_today = 0
-            state.day_start_equity = state.equity
-            state.daily_pnl = 0.0
+        if now_ns >= next_day_ns:
+            next_day_ns = next_utc_midnight_ns(now_ns)
+            today = utc_day(now_ns)
+            if today != state.day_epoch:
+                log_event({
+                    "type": "day_rollover",
+                    "from": day_iso(state.day_epoch),
+                    "to": day_iso(today)
+                }, ts=now_iso)
+                state.day_epoch = today
+                state.trades_today = 0
+                state.day_start_equity = state.equity
+                state.daily_pnl = 0.0
+                daily_loss_limit = -cfg.max_daily_loss_frac * state.day_start_equity
 
         #Daily Loss Kill-Switch
-        max_daily_loss_pct = float(config.get("max_daily_loss_pct", 5.0)) / 100.0
-        daily_loss_limit = -max_daily_loss_pct * state.day_start_equity
-
         if state.daily_pnl <= daily_loss_limit:
             log_event({
                 "type": "daily_loss_limit_hit",
                 "day_start_equity": state.day_start_equity,
                 "daily_pnl": state.daily_pnl,
                 "limit": daily_loss_limit
-            })
-            time.sleep(interval)
+            }, ts=now_iso)
             continue
 
         try:
-            if use_candles:
-                candle = get_binance_last_closed_candle(symbol, candle_interval)
-
-                # nur weiterarbeiten, wenn neue Kerze abgeschlossen wurde
-                if candle["close_time"] == last_candle_close_time:
-                    time.sleep(interval)
+            if feed is not None and scfg.use_candles:
+                # blockiert bis zum naechsten Push (nur abgeschlossene Kerzen)
+                pushed = feed.get(timeout=cfg.interval_sec)
+                waited = True
+                if pushed is None:
+                    continue
+                now_ns = time.time_ns()
+                now_iso = _iso_now(now_ns)
+            elif feed is not None:
+                # Preis-Modus: Takt bleibt interval_sec, nur den neuesten Trade-Preis lesen
+                # (sonst waere jeder Trade ein Tick -> EMAs/hold_candles pro Trade)
+                pushed = feed.latest(timeout=cfg.interval_sec)
+                if pushed is None:
                     continue
 
-                last_candle_close_time = candle["close_time"]
-                price = candle["close"]  # wir arbeiten mit Close
+            if scfg.use_candles:
+                if feed is not None:
+                    candle = pushed
+                else:
+                    candle = get_binance_last_closed_candle(symbol, scfg.candle_interval)
+
+                # Candle = (open_time, open, high, low, close, volume, close_time)
+                _, _, _, _, price, _, close_time = candle  # wir arbeiten mit Close
 
-                log_event({
-                    "type": "candle_ok",
-                    "symbol": symbol,
-                    "interval": candle_interval,
-                    **candle
-                })
+                # nur weiterarbeiten, wenn neue Kerze abgeschlossen wurde
+                # (ws: auch schon per Warmup verarbeitete Kerzen verwerfen)
+                if last_candle_close_time is not None and close_time <= last_candle_close_time:
+                    continue
+                if feed is None:
+                    if candle_ms:
+                        next_close_sec = (close_time + candle_ms) / 1000.0
+                        deadline = time.monotonic() + max(0.0, next_close_sec - time.time() + CANDLE_CLOSE_GRACE_SEC)
+
+                last_candle_close_time = close_time
+
+                if cfg.debug:
+                    log_event({
+                        "type": "candle_ok",
+                        "symbol": symbol,
+                        "interval": scfg.candle_interval,
+                        **candle._asdict()
+                    }, ts=now_iso)
                 last_candle = candle
             else:
-                price = get_binance_price(symbol)
-                log_event({
-                    "type": "marketdata_ok",
-                    "symbol": symbol,
-                    "price": price
-                })
+                price = pushed if feed is not None else get_binance_price(symbol)
+                if cfg.debug:
+                    marketdata_evt["price"] = price
+                    log_event(marketdata_evt, ts=now_iso)
         except Exception as e:
             log_event({
                 "type": "marketdata_error",
                 "symbol": symbol,
                 "error": str(e)
-            })
-            time.sleep(interval)
+            }, ts=now_iso)
             continue
 
-
-        log_event({
-        "type": "tick",
-        "counter": counter,
-        "symbol": symbol,
-        "mode": config["mode"],
-        "price": price,
-        "candle_interval": candle_interval if use_candles else None,
-        "trades_today": state.trades_today,
-        "has_position": state.position is not None,
-        "equity": state.equity,
-        "daily_pnl": state.daily_pnl
-        })
-
-        if not config.get("trade_enabled", False):
-            time.sleep(interval)
+        if not cfg.trade_enabled:
             continue
 
+        pos = state.position  # einmal lesen; nach Entry neu binden
+
         # Risk gate: max trades/day (block new entries, but still manage exits)
-        if state.trades_today >= int(config["max_trades_per_day"]):
+        if state.trades_today >= cfg.max_trades_per_day:
             # wir lassen Exits trotzdem laufen -> deshalb: NICHT hier continue, wenn Position offen
-            if state.position is None:
-                time.sleep(interval)
+            if pos is None:
                 continue
 
+        # Idle-Ticks erst nach den Guards und nur noch als Stichprobe loggen
+        has_position = pos is not None
+        if cfg.debug or has_position != had_position or counter % TICK_LOG_EVERY == 0:
+            tick_evt["counter"] = counter
+            tick_evt["price"] = price
+            tick_evt["trades_today"] = state.trades_today
+            tick_evt["has_position"] = has_position
+            tick_evt["equity"] = state.equity
+            tick_evt["daily_pnl"] = state.daily_pnl
+            log_event(tick_evt, ts=now_iso)
+        had_position = has_position
 
         # Strategy update
         signal = None
         info = {}
 
-        if strategy_name == "trend_pullback":
-            trend_state, signal, info = on_candle(
-                trend_state,
-                last_candle,
-                ema_trend=ema_trend,
-                ema_fast=ema_fast_pb,
-                ema_slow=ema_slow_pb,
-                pullback_band_pct=pullback_band_pct,
-                swing_lookback=swing_lookback
-            )
-
-            log_event({
-                "type": "strategy_state",
-                "strategy": "trend_pullback",
-                "ema_fast": info.get("ema_fast"),
-                "ema_slow": info.get("ema_slow"),
-                "ema_trend": info.get("ema_trend"),
-                "signal": signal,
-                "swing_low": info.get("swing_low"),
-                "swing_high": info.get("swing_high"),
-                "touch_fast": info.get("touch_fast"),
-                "touch_slow": info.get("touch_slow")
-            })
+        if use_trend:
+            _, c_open, c_high, c_low, c_close, _, _ = last_candle
+            trend_state, signal, info = trend_step(trend_state, c_open, c_high, c_low, c_close, cfg.debug)
+
+            if cfg.debug:
+                trend_evt["ema_fast"] = info.get("ema_fast")
+                trend_evt["ema_slow"] = info.get("ema_slow")
+                trend_evt["ema_trend"] = info.get("ema_trend")
+                trend_evt["signal"] = signal
+                trend_evt["swing_low"] = info.get("swing_low")
+                trend_evt["swing_high"] = info.get("swing_high")
+                trend_evt["touch_fast"] = info.get("touch_fast")
+                trend_evt["touch_slow"] = info.get("touch_slow")
+                log_event(trend_evt, ts=now_iso)
         else:
             # fallback: EMA crossover (falls du es noch behalten willst)
-            strat_state, signal = on_price(strat_state, price, ema_fast, ema_slow)
-            log_event({
-                "type": "strategy_state",
-                "strategy": "ema_cross",
-                "ema_fast": strat_state.ema_fast,
-                "ema_slow": strat_state.ema_slow,
-                "signal": signal
-            })
+            strat_state, signal = on_price(strat_state, price, scfg.alpha_fast, scfg.alpha_slow)
+            if cfg.debug:
+                ema_evt["ema_fast"] = strat_state.ema_fast
+                ema_evt["ema_slow"] = strat_state.ema_slow
+                ema_evt["signal"] = signal
+                log_event(ema_evt, ts=now_iso)
 
         # Entry (long + short)
-        if state.position is None and signal in ("long", "short"):
-            risk_pct = float(config.get("risk_per_trade_pct", 1.0)) / 100.0
-            risk_amount = state.equity * risk_pct
+        if pos is None and signal in ("long", "short"):
+            is_long = signal == "long"
+            risk_amount = state.equity * cfg.risk_frac
 
             # Stop bestimmen (strategieabhängig)
-            if strategy_name == "trend_pullback":
-                if signal == "long":
-                    stop_price = float(info["swing_low"])
-                else:  # short
-                    stop_price = float(info["swing_high"])
+            if use_trend:
+                stop_price = info["swing_low"] if is_long else info["swing_high"]
             else:
-                stop_pct = float(strat_cfg.get("stop_loss_pct", 1.0)) / 100.0
-                stop_price = price * (1.0 - stop_pct) if signal == "long" else price * (1.0 + stop_pct)
+                stop_price = price * (scfg.stop_long_mult if is_long else scfg.stop_short_mult)
 
-            stop_distance = abs(price - stop_price)
-            if stop_distance <= 0:
+            size, take_profit_price = entry_order(price, stop_price, state.equity, cfg.risk_frac, scfg.rr_takeprofit)
+            if size <= 0:
                 log_event({
                     "type": "entry_skipped",
                     "reason": "bad_stop_distance",
-                    "stop_distance": stop_distance
-                })
-                time.sleep(interval)
+                    "stop_distance": abs(price - stop_price)
+                }, ts=now_iso)
                 continue
 
-            size = risk_amount / stop_distance
-
-            # Take Profit (RR)
-            rr_takeprofit = float(strat_cfg.get("rr_takeprofit", 2.0))
-            if signal == "long":
-                take_profit_price = price + rr_takeprofit * (price - stop_price)
-            else:  # short
-                take_profit_price = price - rr_takeprofit * (stop_price - price)
-
-            state.position = Position(
+            state.position = pos = Position(
                 symbol=symbol,
-                side=signal,
+                is_long=is_long,
                 entry_price=price,
                 size=size,
-                opened_at=datetime.now(timezone.utc).isoformat(),
+                opened_at=now_ns,
                 stop_price=stop_price,
                 take_profit_price=take_profit_price
             )
@@ -238,85 +531,20 @@ def main():
                 "stop_price": stop_price,
                 "take_profit_price": take_profit_price,
                 "equity_before": state.equity,
-                "risk_pct": risk_pct,
+                "risk_pct": cfg.risk_frac,
                 "risk_amount": risk_amount,
-                "reason": f"{strategy_name}_{signal}"
-            })
+                "reason": f"{scfg.name}_{signal}"
+            }, ts=now_iso)
 
-        # Exit: Take Profit / Stop-Loss (long + short)
-        if state.position is not None:
-            # TP check
-            tp_hit = (
-                (state.position.side == "long" and price >= state.position.take_profit_price) or
-                (state.position.side == "short" and price <= state.position.take_profit_price)
-            )
-
-            # SL check
-            sl_hit = (
-                (state.position.side == "long" and price <= state.position.stop_price) or
-                (state.position.side == "short" and price >= state.position.stop_price)
-            )
-
-            if tp_hit or sl_hit:
-                if state.position.side == "long":
-                    pnl = (price - state.position.entry_price) * state.position.size
-                else:
-                    pnl = (state.position.entry_price - price) * state.position.size
-
-                state.equity += pnl
-                state.daily_pnl = state.equity - state.day_start_equity
-
-                log_event({
-                    "type": "position_closed",
-                    "symbol": symbol,
-                    "side": state.position.side,
-                    "entry_price": state.position.entry_price,
-                    "exit_price": price,
-                    "size": state.position.size,
-                    "stop_price": state.position.stop_price,
-                    "take_profit_price": state.position.take_profit_price,
-                    "pnl": pnl,
-                    "equity_after": state.equity,
-                    "daily_pnl": state.daily_pnl,
-                    "reason": "take_profit" if tp_hit else "stop_loss"
-                })
-
-                state.position = None
-                hold_candles = 0
-                continue
-
-        # Exit: time-based (in candles)
-        if state.position is not None:
+        # Exit: Take Profit / Stop-Loss / Zeit (in candles), Entscheidung im Kernel, ein Close-Pfad
+        if pos is not None:
             hold_candles += 1
-            if hold_candles >= max_hold_candles:
-                if state.position.side == "long":
-                    pnl = (price - state.position.entry_price) * state.position.size
-                else:
-                    pnl = (state.position.entry_price - price) * state.position.size
-
-                state.equity += pnl
-                state.daily_pnl = state.equity - state.day_start_equity
-
-                log_event({
-                    "type": "position_closed",
-                    "symbol": symbol,
-                    "side": state.position.side,
-                    "entry_price": state.position.entry_price,
-                    "exit_price": price,
-                    "size": state.position.size,
-                    "stop_price": state.position.stop_price,
-                    "take_profit_price": state.position.take_profit_price,
-                    "pnl": pnl,
-                    "equity_after": state.equity,
-                    "daily_pnl": state.daily_pnl,
-                    "reason": "time_exit"
-                })
-
-                state.position = None
+            action = exit_action(
+                pos.side_sign, price, pos.take_profit_price, pos.stop_price, hold_candles, scfg.max_hold_candles
+            )
+            if action != EXIT_NONE:
+                _close_position(state, price, EXIT_REASONS[action], now_iso)
                 hold_candles = 0
 
-
-    time.sleep(interval)
-
 if __name__ == "__main__":
     main()
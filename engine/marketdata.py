@@ -1,32 +1,89 @@
+import time
+from typing import NamedTuple
+
 import requests
+from requests.adapters import HTTPAdapter
+
+# eine Keep-Alive-Verbindung fuer alle REST-Calls statt TCP+TLS-Handshake pro Poll
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+# Puffer gegen Uhrenabweichung zu Binance, wenn "abgeschlossen" per endTime bestimmt wird
+KLINE_CLOCK_SKEW_MS = 500
+
+
+class Candle(NamedTuple):
+    """One kline; a plain tuple underneath, so callers can unpack it positionally."""
+    open_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    close_time: int
+
+
+_INTERVAL_UNIT_MS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_ms(interval: str) -> int | None:
+    """Kline interval ("1m", "4h", ...) in ms; None for "1M" (months have no fixed length)."""
+    unit_ms = _INTERVAL_UNIT_MS.get(interval[-1:])
+    if unit_ms is None or not interval[:-1].isdigit():
+        return None
+    return int(interval[:-1]) * unit_ms
 
 def get_binance_price(symbol: str) -> float:
     url = "https://api.binance.com/api/v3/ticker/price"
-    r = requests.get(url, params={"symbol": symbol}, timeout=10)
+    r = _SESSION.get(url, params={"symbol": symbol}, timeout=10)
     r.raise_for_status()
     data = r.json()
     return float(data["price"])
 
-def get_binance_last_closed_candle(symbol: str, interval: str = "1m") -> dict:
+def get_binance_last_closed_candle(symbol: str, interval: str = "1m") -> Candle:
     """
-    Returns last *closed* kline as dict: {open_time, open, high, low, close, volume, close_time}
+    Returns last *closed* kline as Candle(open_time, open, high, low, close, volume, close_time)
     Binance klines: https://api.binance.com/api/v3/klines
-    We request last 2 and take the first -> closed candle.
+    We request 1 kline opened at least one interval ago (endTime) -> closed candle.
+    Intervals without fixed length ("1M") fall back to: last 2, take the first.
     """
     url = "https://api.binance.com/api/v3/klines"
-    r = requests.get(url, params={"symbol": symbol, "interval": interval, "limit": 2}, timeout=10)
+    params = {"symbol": symbol, "interval": interval, "limit": 2}
+    iv_ms = interval_ms(interval)
+    if iv_ms is not None:
+        params["limit"] = 1
+        params["endTime"] = time.time_ns() // 1_000_000 - iv_ms - KLINE_CLOCK_SKEW_MS
+    r = _SESSION.get(url, params=params, timeout=10)
     r.raise_for_status()
     klines = r.json()
-    if len(klines) < 2:
+    if len(klines) < params["limit"]:
         raise RuntimeError("Not enough klines returned")
 
-    k = klines[0]  # last closed
-    return {
-        "open_time": int(k[0]),
-        "open": float(k[1]),
-        "high": float(k[2]),
-        "low": float(k[3]),
-        "close": float(k[4]),
-        "volume": float(k[5]),
-        "close_time": int(k[6]),
-    }
+    return _parse_kline(klines[0])  # last closed
+
+KLINES_MAX_LIMIT = 1000  # Binance-Maximum pro /klines-Request
+
+def get_binance_closed_candles(symbol: str, interval: str = "1m", limit: int = 500) -> list[Candle]:
+    """
+    Returns up to `limit` most recent *closed* klines, oldest first (warmup / backtest).
+    More than KLINES_MAX_LIMIT are fetched in pages backwards via endTime.
+    """
+    url = "https://api.binance.com/api/v3/klines"
+    params = {"symbol": symbol, "interval": interval, "limit": min(limit + 1, KLINES_MAX_LIMIT)}
+    r = _SESSION.get(url, params=params, timeout=10)
+    r.raise_for_status()
+    candles = [_parse_kline(k) for k in r.json()[:-1]]  # last one is still open
+
+    while candles and len(candles) < limit:
+        # aeltere Seite: alles was vor der aeltesten bisherigen Kerze eroeffnet wurde
+        params["limit"] = min(limit - len(candles), KLINES_MAX_LIMIT)
+        params["endTime"] = candles[0].open_time - 1
+        r = _SESSION.get(url, params=params, timeout=10)
+        r.raise_for_status()
+        klines = r.json()
+        if not klines:  # Anfang der Historie
+            break
+        candles[:0] = [_parse_kline(k) for k in klines]
+    return candles
+
+def _parse_kline(k: list) -> Candle:
+    return Candle(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6]))
@@ -1,33 +1,63 @@
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import time
+from dataclasses import dataclass, field
 
-@dataclass
+_DAY_NS = 86_400 * 1_000_000_000
+
+@dataclass(slots=True)
 class Position:
     symbol: str
-    side: str            # "long" / "short"
+    is_long: bool        # False -> short
     entry_price: float
     size: float
-    opened_at: str
+    opened_at: int       # epoch ns
     stop_price: float
     take_profit_price: float | None
+    side_sign: int = field(init=False)  # +1 long / -1 short
+
+    def __post_init__(self) -> None:
+        self.side_sign = 1 if self.is_long else -1
+
+    @property
+    def side(self) -> str:
+        """"long" / "short", only for logging."""
+        return "long" if self.is_long else "short"
 
-@dataclass
+@dataclass(slots=True)
 class EngineState:
     position: Position | None
     trades_today: int
-    day_utc: str
+    day_epoch: int       # UTC-Tag seit 1970-01-01
     equity: float
     daily_pnl: float
     day_start_equity: float
 
-def utc_day() -> str:
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+def utc_day(now_ns: int | None = None) -> int:
+    """UTC day number (days since epoch); compare as int, format with day_iso() for logs."""
+    if now_ns is None:
+        now_ns = time.time_ns()
+    return now_ns // _DAY_NS
+
+def candle_day(close_time_ms: int) -> int:
+    """
+    UTC day a closed kline counts to in the live loop: it is processed in the first tick
+    after its close (close_time + 1 ms), so a candle closing at 23:59:59.999 belongs to the next day.
+    """
+    return (close_time_ms + 1) // 86_400_000
+
+def day_iso(day: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(day * 86_400))
+
+def next_utc_midnight_ns(now_ns: int | None = None) -> int:
+    """Epoch ns of the next UTC midnight (POSIX days are exactly 86400s)."""
+    if now_ns is None:
+        now_ns = time.time_ns()
+    return (now_ns // _DAY_NS + 1) * _DAY_NS
 
 def new_state(initial_equity: float) -> EngineState:
     return EngineState(
         position=None,
         trades_today=0,
-        day_utc=utc_day(),
+        day_epoch=utc_day(),
         equity=initial_equity,
         daily_pnl=0.0,
         day_start_equity=initial_equity
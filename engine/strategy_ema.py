@@ -1,33 +1,74 @@
 from dataclasses import dataclass
+from typing import Sequence
+
+_NAN = float("nan")  # "noch kein Preis" statt None -> EMAs bleiben immer float
+_SIGNALS = (None, "long", "short")  # Index = Signal-Code, -1 -> "short"
 
 @dataclass
 class EmaState:
-    ema_fast: float | None = None
-    ema_slow: float | None = None
-    last_signal: str | None = None  # "long", "short", None
+    ema_fast: float = _NAN
+    ema_slow: float = _NAN
+    last_sig: int = 0  # 1 = long, -1 = short, 0 = none yet
 
-def ema_update(prev: float | None, price: float, period: int) -> float:
-    alpha = 2.0 / (period + 1.0)
-    if prev is None:
-        return price
-    return prev + alpha * (price - prev)
+    @property
+    def last_signal(self) -> str | None:
+        return _SIGNALS[self.last_sig]
 
-def on_price(state: EmaState, price: float, fast: int, slow: int) -> tuple[EmaState, str | None]:
-    # Update EMAs
-    state.ema_fast = ema_update(state.ema_fast, price, fast)
-    state.ema_slow = ema_update(state.ema_slow, price, slow)
+def ema_alpha(period: int) -> float:
+    return 2.0 / (period + 1.0)
 
-    # Need both
-    if state.ema_fast is None or state.ema_slow is None:
-        return state, None
+def _ema_step(
+    ema_fast: float,
+    ema_slow: float,
+    last_sig: int,
+    price: float,
+    alpha_fast: float,
+    alpha_slow: float
+) -> tuple[float, float, int, int]:
+    """
+    One EMA-cross update on plain scalars (NaN EMAs = first price).
+    Returns (ema_fast, ema_slow, last_sig, signal); signal 1 = long, -1 = short, 0 = none.
+    """
+    if ema_fast != ema_fast:  # NaN
+        ema_fast = ema_slow = price
+    else:
+        ema_fast += alpha_fast * (price - ema_fast)
+        ema_slow += alpha_slow * (price - ema_slow)
 
     # Signal when crossing
-    if state.ema_fast > state.ema_slow and state.last_signal != "long":
-        state.last_signal = "long"
-        return state, "long"
+    if ema_fast > ema_slow and last_sig != 1:
+        return ema_fast, ema_slow, 1, 1
+    if ema_fast < ema_slow and last_sig != -1:
+        return ema_fast, ema_slow, -1, -1
+    return ema_fast, ema_slow, last_sig, 0
+
+def on_price(state: EmaState, price: float, alpha_fast: float, alpha_slow: float) -> tuple[EmaState, str | None]:
+    # alphas precomputed by caller, see ema_alpha
+    state.ema_fast, state.ema_slow, state.last_sig, sig = _ema_step(
+        state.ema_fast, state.ema_slow, state.last_sig, price, alpha_fast, alpha_slow
+    )
+    return state, _SIGNALS[sig]
+
+def ema_cross_batch(prices: Sequence[float], alpha_fast: float, alpha_slow: float, state: EmaState | None = None) -> list[int]:
+    """
+    on_price over a whole price series in one loop (same _ema_step kernel, EMAs in
+    locals instead of state attributes) -> warmup / replay.
+    Returns one code per price: 1 = long, -1 = short, 0 = no signal.
+    If a state is passed, it is continued and left at the end of the series.
+    """
+    if state is None:
+        state = EmaState()
+    alpha_f = alpha_fast
+    alpha_s = alpha_slow
+    ef = state.ema_fast
+    es = state.ema_slow
+    last = state.last_sig
 
-    if state.ema_fast < state.ema_slow and state.last_signal != "short":
-        state.last_signal = "short"
-        return state, "short"
+    out = [0] * len(prices)
+    for i, p in enumerate(prices):
+        ef, es, last, out[i] = _ema_step(ef, es, last, p, alpha_f, alpha_s)
 
-    return state, None
+    state.ema_fast = ef
+    state.ema_slow = es
+    state.last_sig = last
+    return out
@@ -1,97 +1,455 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from collections import deque
-from typing import Deque, Optional, Tuple, Dict, Any
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
 
-def _ema_update(prev: Optional[float], price: float, length: int) -> float:
-    if prev is None:
-        return price
-    alpha = 2.0 / (length + 1.0)
-    return prev + alpha * (price - prev)
+_NAN = float("nan")  # "noch keine Kerze" statt None -> EMAs bleiben immer float
+_SIGNALS = (None, "long", "short")  # Index = Signal-Code, -1 -> "short"
+_NO_INFO: Mapping[str, float] = MappingProxyType({})  # info ohne Signal (read-only, geteilt)
+
+SWING_MAX_LOOKBACK = 50  # swing_lookback wird darauf begrenzt
+
+_INF = float("inf")
+
+
+class SwingWindow:
+    """
+    Sliding min(low) / max(high) over the last `size` candles (Two-Stacks Lite SWAG).
+    One ring of `size` slots per side: the front part [f, b) holds suffix aggregates
+    (min/max from there to b), the back part [b, e) raw values plus their running
+    aggregate. Query = front aggregate combined with the back aggregate; when the
+    front runs empty an eviction "flips" the back into suffix aggregates.
+    Per candle at most one flip of <= size slots, no allocations after init.
+    The raw lows/highs of the last SWING_MAX_LOOKBACK candles are kept as well, so
+    resized() can rebuild a window of another size from the existing history.
+    """
+    __slots__ = ("size", "lows", "highs", "f", "b", "e", "agg_low", "agg_high", "raw_lows", "raw_highs")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lows = [0.0] * size
+        self.highs = [0.0] * size
+        self.f = self.b = self.e = 0  # laufende Indizes, Slot = Index % size
+        self.agg_low = _INF
+        self.agg_high = -_INF
+        # Rohwerte, Slot = Index % SWING_MAX_LOOKBACK
+        self.raw_lows = [0.0] * SWING_MAX_LOOKBACK
+        self.raw_highs = [0.0] * SWING_MAX_LOOKBACK
+
+    def push(self, l: float, h: float) -> None:
+        size = self.size
+        e = self.e
+        if e - self.f == size:
+            self._evict()
+        slot = e % size
+        self.lows[slot] = l
+        self.highs[slot] = h
+        raw = e % SWING_MAX_LOOKBACK
+        self.raw_lows[raw] = l
+        self.raw_highs[raw] = h
+        self.e = e + 1
+        if l < self.agg_low:
+            self.agg_low = l
+        if h > self.agg_high:
+            self.agg_high = h
+
+    def _evict(self) -> None:
+        if self.f == self.b:
+            # Flip: Back-Teil [f, e) in Suffix-Aggregate umschreiben
+            size = self.size
+            lows = self.lows
+            highs = self.highs
+            lo = _INF
+            hi = -_INF
+            for i in range(self.e - 1, self.f - 1, -1):
+                slot = i % size
+                if lows[slot] < lo:
+                    lo = lows[slot]
+                if highs[slot] > hi:
+                    hi = highs[slot]
+                lows[slot] = lo
+                highs[slot] = hi
+            self.b = self.e
+            self.agg_low = _INF
+            self.agg_high = -_INF
+        self.f += 1
+
+    def resized(self, size: int) -> SwingWindow:
+        """New window of `size` over the same candles (the last min(size, pushed) of them)."""
+        win = SwingWindow(size)
+        win.raw_lows = self.raw_lows  # Ring wird uebernommen, self danach nicht mehr benutzen
+        win.raw_highs = self.raw_highs
+        e = self.e
+        start = e - size if e > size else 0
+        win.f = win.b = win.e = start  # gleiche laufenden Indizes -> gleiche Raw-Slots
+        for i in range(start, e):
+            raw = i % SWING_MAX_LOOKBACK
+            win.push(win.raw_lows[raw], win.raw_highs[raw])
+        return win
+
+    def query(self) -> Tuple[float, float]:
+        """(swing_low, swing_high) of the window; (inf, -inf) while empty."""
+        if self.f == self.b:
+            return self.agg_low, self.agg_high
+        slot = self.f % self.size
+        lo = self.lows[slot]
+        hi = self.highs[slot]
+        return (lo if lo < self.agg_low else self.agg_low), (hi if hi > self.agg_high else self.agg_high)
 
 
 @dataclass
 class TrendPullbackState:
-    ema20: Optional[float] = None
-    ema50: Optional[float] = None
-    ema200: Optional[float] = None
-    lows: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
-    highs: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+    ema20: float = _NAN
+    ema50: float = _NAN
+    ema200: float = _NAN
+    # Swing-Fenster, angelegt bei der ersten Kerze; bei geaendertem swing_lookback (Reload)
+    # aus den gespeicherten Rohwerten neu aufgebaut
+    swing: Optional[SwingWindow] = None
 
 
-def on_candle(
+def _swing_size(swing_lookback: int) -> int:
+    # swing_lookback auf [1, SWING_MAX_LOOKBACK] begrenzen; Ternaries statt max(1, min(...)) (pro Kerze)
+    if swing_lookback < 1:
+        return 1
+    return swing_lookback if swing_lookback < SWING_MAX_LOOKBACK else SWING_MAX_LOOKBACK
+
+
+def _swing_window(state: TrendPullbackState, size: int) -> SwingWindow:
+    """state.swing with `size` slots (size from _swing_size)."""
+    swing = state.swing
+    if swing is None:
+        swing = state.swing = SwingWindow(size)
+    elif swing.size != size:
+        swing = state.swing = swing.resized(size)
+    return swing
+
+
+def warmup(
     state: TrendPullbackState,
-    candle: Dict[str, Any],
+    candles: Sequence[Tuple[int, float, float, float, float, float, int]],
+    ema_trend: int = 200,
+    ema_fast: int = 20,
+    ema_slow: int = 50,
+    swing_lookback: int = 5
+) -> TrendPullbackState:
+    """
+    Feeds historical candles into the state: same EMAs and swing buffers as calling
+    on_candle for each of them (same EMA recurrence), but no signal work.
+    """
+    if not candles:
+        return state
+    alpha_f = 2.0 / (ema_fast + 1.0)
+    alpha_s = 2.0 / (ema_slow + 1.0)
+    alpha_t = 2.0 / (ema_trend + 1.0)
+    ema_f, ema_s, ema_t = state.ema20, state.ema50, state.ema200
+    for candle in candles:
+        c = candle[4]
+        if ema_t != ema_t:  # NaN
+            ema_f = ema_s = ema_t = c
+        else:
+            ema_f += alpha_f * (c - ema_f)
+            ema_s += alpha_s * (c - ema_s)
+            ema_t += alpha_t * (c - ema_t)
+    state.ema20, state.ema50, state.ema200 = ema_f, ema_s, ema_t
+    # nur die letzten Kerzen koennen noch im Swing-Fenster liegen (oder nach einem Reload hineinkommen)
+    swing = _swing_window(state, _swing_size(swing_lookback))
+    for c in candles[-SWING_MAX_LOOKBACK:]:
+        swing.push(c[3], c[2])
+    return state
+
+
+def _trend_step(
+    ema_f: float,
+    ema_s: float,
+    ema_t: float,
+    o: float,
+    h: float,
+    l: float,
+    c: float,
+    alpha_f: float,
+    alpha_s: float,
+    alpha_t: float,
+    band: float
+) -> Tuple[float, float, float, int]:
+    """
+    EMA update + signal of one candle on plain scalars (NaN EMAs = first candle).
+    The one trend_pullback kernel: on_candle / make_on_candle, batch and pool all call it.
+    Returns (ema_f, ema_s, ema_t, signal); signal 1 = long, -1 = short, 0 = none.
+    """
+    # Update EMAs on close
+    if ema_t != ema_t:  # NaN
+        ema_f = ema_s = ema_t = c
+    else:
+        ema_f += alpha_f * (c - ema_f)
+        ema_s += alpha_s * (c - ema_s)
+        ema_t += alpha_t * (c - ema_t)
+
+    # Trend filter + Candle direction (simpel, robust), dann Pullback-Touch (ODER) über low/high Nähe.
+    # |x - ema| <= ema * band statt |x - ema| / ema <= band; nur die Seite, die Trend + Richtung
+    # zulassen, mit Kurzschluss (meist 0-2 statt 4 Vergleiche)
+    if c > ema_t:
+        if c > o and (abs(l - ema_f) <= ema_f * band or abs(l - ema_s) <= ema_s * band):
+            return ema_f, ema_s, ema_t, 1
+    elif c < ema_t and c < o and (abs(h - ema_f) <= ema_f * band or abs(h - ema_s) <= ema_s * band):
+        return ema_f, ema_s, ema_t, -1
+    return ema_f, ema_s, ema_t, 0
+
+
+def _trend_info(
+    ema_f: float,
+    ema_s: float,
+    ema_t: float,
+    h: float,
+    l: float,
+    band: float,
+    swing: SwingWindow
+) -> Dict[str, float]:
+    """info dict of one candle (EMAs, swing levels for the stop, touch flags)."""
+    # Swing levels für Stop
+    # (Wir nehmen min low / max high der letzten N Candles)
+    swing_low, swing_high = swing.query()
+    dev_f = ema_f * band
+    dev_s = ema_s * band
+    return {
+        "ema_fast": ema_f,
+        "ema_slow": ema_s,
+        "ema_trend": ema_t,
+        "swing_low": swing_low,
+        "swing_high": swing_high,
+        "touch_fast": 1.0 if abs(l - ema_f) <= dev_f or abs(h - ema_f) <= dev_f else 0.0,
+        "touch_slow": 1.0 if abs(l - ema_s) <= dev_s or abs(h - ema_s) <= dev_s else 0.0,
+    }
+
+
+def make_on_candle(
     ema_trend: int = 200,
     ema_fast: int = 20,
     ema_slow: int = 50,
     pullback_band_pct: float = 0.0015,
     swing_lookback: int = 5
-) -> Tuple[TrendPullbackState, Optional[str], Dict[str, float]]:
+) -> Callable[..., Tuple[TrendPullbackState, Optional[str], Mapping[str, float]]]:
+    """
+    on_candle specialized for one parameter set: alphas, band and window size are
+    bound once in the closure (no keyword passing per candle).
+    Returns step(state, o, h, l, c, include_info=False) -> same result as on_candle.
+    Build a new one when the strategy config changes.
+    """
+    alpha_f = 2.0 / (ema_fast + 1.0)
+    alpha_s = 2.0 / (ema_slow + 1.0)
+    alpha_t = 2.0 / (ema_trend + 1.0)
+    band = pullback_band_pct
+    size = _swing_size(swing_lookback)
+
+    def step(
+        state: TrendPullbackState,
+        o: float,
+        h: float,
+        l: float,
+        c: float,
+        include_info: bool = False
+    ) -> Tuple[TrendPullbackState, Optional[str], Mapping[str, float]]:
+        # Update rolling swing low/high
+        swing = _swing_window(state, size)
+        swing.push(l, h)
+
+        ema_f, ema_s, ema_t, sig = _trend_step(
+            state.ema20, state.ema50, state.ema200, o, h, l, c, alpha_f, alpha_s, alpha_t, band
+        )
+        state.ema20 = ema_f
+        state.ema50 = ema_s
+        state.ema200 = ema_t
+
+        if not sig and not include_info:
+            return state, None, _NO_INFO
+        return state, _SIGNALS[sig], _trend_info(ema_f, ema_s, ema_t, h, l, band, swing)
+
+    return step
+
+
+# on_candle: ein Step pro Parametersatz, bleibt ueber Aufrufe erhalten (Reload -> neuer Eintrag)
+_cached_step = lru_cache(maxsize=8)(make_on_candle)
+
+
+def on_candle(
+    state: TrendPullbackState,
+    o: float,
+    h: float,
+    l: float,
+    c: float,
+    ema_trend: int = 200,
+    ema_fast: int = 20,
+    ema_slow: int = 50,
+    pullback_band_pct: float = 0.0015,
+    swing_lookback: int = 5,
+    include_info: bool = False
+) -> Tuple[TrendPullbackState, Optional[str], Mapping[str, float]]:
     """
     Returns: (updated_state, signal 'long'/'short'/None, info dict)
-    Candle expects: open, high, low, close (floats)
+    o, h, l, c: open/high/low/close of the closed candle, already float (no coercion here)
+    info is only filled when a signal fires or include_info=True, otherwise empty.
+    Runs the make_on_candle step for these params (cached), so both give identical results.
     """
-    o = float(candle["open"])
-    h = float(candle["high"])
-    l = float(candle["low"])
-    c = float(candle["close"])
+    step = _cached_step(ema_trend, ema_fast, ema_slow, pullback_band_pct, swing_lookback)
+    return step(state, o, h, l, c, include_info)
 
-    # Update rolling highs/lows
-    state.lows.append(l)
-    state.highs.append(h)
 
-    # Update EMAs on close
-    state.ema20 = _ema_update(state.ema20, c, ema_fast)
-    state.ema50 = _ema_update(state.ema50, c, ema_slow)
-    state.ema200 = _ema_update(state.ema200, c, ema_trend)
+class TrendBatch(NamedTuple):
+    """Result of on_candles_batch: one entry per candle (columns, not one object per candle)."""
+    signals: List[int]  # 1 = long, -1 = short, 0 = none
+    ema_fast: List[float]
+    ema_slow: List[float]
+    ema_trend: List[float]
+    swing_low: List[float]
+    swing_high: List[float]
+
+
+def on_candles_batch(
+    state: TrendPullbackState,
+    opens: Sequence[float],
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    ema_trend: int = 200,
+    ema_fast: int = 20,
+    ema_slow: int = 50,
+    pullback_band_pct: float = 0.0015,
+    swing_lookback: int = 5
+) -> TrendBatch:
+    """
+    on_candle over whole OHLC columns in one loop (same _trend_step kernel, EMAs in
+    locals instead of state attributes, no info dicts) -> replay / research.
+    The state is continued and left at the end of the series.
+    """
+    n = len(closes)
+    signals = [0] * n
+    col_f = [0.0] * n
+    col_s = [0.0] * n
+    col_t = [0.0] * n
+    col_lo = [0.0] * n
+    col_hi = [0.0] * n
 
-    # Need all EMAs initialized
-    if state.ema20 is None or state.ema50 is None or state.ema200 is None:
-        return state, None, {}
+    alpha_f = 2.0 / (ema_fast + 1.0)
+    alpha_s = 2.0 / (ema_slow + 1.0)
+    alpha_t = 2.0 / (ema_trend + 1.0)
+    band = pullback_band_pct
+    swing = _swing_window(state, _swing_size(swing_lookback))
+    push = swing.push
+    query = swing.query
+    ema_f, ema_s, ema_t = state.ema20, state.ema50, state.ema200
 
-    # Trend filter
-    trend_up = c > state.ema200
-    trend_down = c < state.ema200
+    for k in range(n):
+        o = opens[k]
+        h = highs[k]
+        l = lows[k]
+        c = closes[k]
 
-    # Pullback touch (ODER): wir prüfen "Touch" über low/high Nähe
-    def near(x: float, ema: float) -> bool:
-        return abs(x - ema) / ema <= pullback_band_pct
+        push(l, h)
+        ema_f, ema_s, ema_t, signals[k] = _trend_step(
+            ema_f, ema_s, ema_t, o, h, l, c, alpha_f, alpha_s, alpha_t, band
+        )
 
-    touch_fast_up = near(l, state.ema20)
-    touch_slow_up = near(l, state.ema50)
-    touch_fast_dn = near(h, state.ema20)
-    touch_slow_dn = near(h, state.ema50)
+        col_f[k] = ema_f
+        col_s[k] = ema_s
+        col_t[k] = ema_t
+        col_lo[k], col_hi[k] = query()
 
-    # Candle direction (simpel, robust)
-    bullish = c > o
-    bearish = c < o
+    state.ema20, state.ema50, state.ema200 = ema_f, ema_s, ema_t
+    return TrendBatch(signals, col_f, col_s, col_t, col_lo, col_hi)
 
-    # Swing levels für Stop
-    # (Wir nehmen min low / max high der letzten N Candles)
-    look = max(1, min(swing_lookback, len(state.lows)))
-    recent_lows = list(state.lows)[-look:]
-    recent_highs = list(state.highs)[-look:]
-    swing_low = min(recent_lows) if recent_lows else l
-    swing_high = max(recent_highs) if recent_highs else h
-
-    signal: Optional[str] = None
-
-    if trend_up and (touch_fast_up or touch_slow_up) and bullish:
-        signal = "long"
-    elif trend_down and (touch_fast_dn or touch_slow_dn) and bearish:
-        signal = "short"
-
-    info = {
-        "ema_fast": float(state.ema20),
-        "ema_slow": float(state.ema50),
-        "ema_trend": float(state.ema200),
-        "swing_low": float(swing_low),
-        "swing_high": float(swing_high),
-        "touch_fast": 1.0 if (touch_fast_up or touch_fast_dn) else 0.0,
-        "touch_slow": 1.0 if (touch_slow_up or touch_slow_dn) else 0.0,
-    }
 
-    return state, signal, info
+class TrendPullbackPool:
+    """
+    trend_pullback state for many symbols as columns (one list per field, indexed by
+    symbol id) instead of one TrendPullbackState object per symbol. Parameters are
+    fixed per pool, so alphas / window size are computed once.
+    """
+
+    def __init__(
+        self,
+        n_symbols: int,
+        ema_trend: int = 200,
+        ema_fast: int = 20,
+        ema_slow: int = 50,
+        pullback_band_pct: float = 0.0015,
+        swing_lookback: int = 5
+    ):
+        self.alpha_f = 2.0 / (ema_fast + 1.0)
+        self.alpha_s = 2.0 / (ema_slow + 1.0)
+        self.alpha_t = 2.0 / (ema_trend + 1.0)
+        self.band = pullback_band_pct
+        size = _swing_size(swing_lookback)
+        self.ema_fast = [_NAN] * n_symbols
+        self.ema_slow = [_NAN] * n_symbols
+        self.ema_trend = [_NAN] * n_symbols
+        self.swings = [SwingWindow(size) for _ in range(n_symbols)]
+
+    def on_candles(
+        self,
+        sym_ids: Sequence[int],
+        opens: Sequence[float],
+        highs: Sequence[float],
+        lows: Sequence[float],
+        closes: Sequence[float]
+    ) -> TrendBatch:
+        """
+        One closed candle per row for symbol sym_ids[k] (same _trend_step kernel as on_candle).
+        Rows are processed in order, so a symbol may appear more than once.
+        """
+        n = len(sym_ids)
+        signals = [0] * n
+        col_f = [0.0] * n
+        col_s = [0.0] * n
+        col_t = [0.0] * n
+        col_lo = [0.0] * n
+        col_hi = [0.0] * n
+
+        alpha_f, alpha_s, alpha_t, band = self.alpha_f, self.alpha_s, self.alpha_t, self.band
+        emas_f, emas_s, emas_t, swings = self.ema_fast, self.ema_slow, self.ema_trend, self.swings
+
+        for k in range(n):
+            sym = sym_ids[k]
+            o = opens[k]
+            h = highs[k]
+            l = lows[k]
+            c = closes[k]
+
+            swing = swings[sym]
+            swing.push(l, h)
+            ema_f, ema_s, ema_t, signals[k] = _trend_step(
+                emas_f[sym], emas_s[sym], emas_t[sym], o, h, l, c, alpha_f, alpha_s, alpha_t, band
+            )
+            emas_f[sym] = ema_f
+            emas_s[sym] = ema_s
+            emas_t[sym] = ema_t
+
+            col_f[k] = ema_f
+            col_s[k] = ema_s
+            col_t[k] = ema_t
+            col_lo[k], col_hi[k] = swing.query()
+
+        return TrendBatch(signals, col_f, col_s, col_t, col_lo, col_hi)
+
+
+def on_candle_dict(
+    state: TrendPullbackState,
+    candle: Dict[str, Any],
+    include_info: bool = True,
+    **params
+) -> Tuple[TrendPullbackState, Optional[str], Mapping[str, float]]:
+    """
+    on_candle for dict candles {"open", "high", "low", "close", ...} (old API).
+    Converts with float() here, since old callers may pass strings/ints.
+    include_info defaults to True: old callers get the full info dict on every candle.
+    """
+    return on_candle(
+        state,
+        float(candle["open"]),
+        float(candle["high"]),
+        float(candle["low"]),
+        float(candle["close"]),
+        include_info=include_info,
+        **params
+    )
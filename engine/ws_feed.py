@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from collections import deque
+
+from websockets.sync.client import connect
+
+from engine.marketdata import Candle
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+
+
+class BinanceFeed:
+    """
+    Push-based market data from the Binance WebSocket API, read in a background thread.
+    interval=None  -> <symbol>@trade stream, delivers the last trade price (float)
+    interval="1m"  -> <symbol>@kline_<interval> stream, delivers only *closed* candles
+                      (same Candle tuple as get_binance_last_closed_candle)
+    Last-value semantics: a deque(maxlen=1) slot holds only the newest item, so bursts
+    while the engine is busy collapse into "latest wins" (no queue growth, no queue lock).
+    get() consumes pushes (one engine tick per closed candle); latest() samples the
+    newest trade price on the engine's own interval_sec clock.
+    """
+
+    def __init__(self, symbol: str, interval: str | None = None, reconnect_sec: float = 5.0):
+        stream = f"{symbol.lower()}@kline_{interval}" if interval else f"{symbol.lower()}@trade"
+        self.url = f"{BINANCE_WS_URL}/{stream}"
+        self.interval = interval
+        self.reconnect_sec = reconnect_sec
+        self.last_error: str | None = None
+        self._latest: deque = deque(maxlen=1)
+        self._last = None  # zuletzt gepushter Wert, fuer latest()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ws-{stream}", daemon=True)
+
+    def start(self) -> "BinanceFeed":
+        self._thread.start()
+        return self
+
+    def get(self, timeout: float):
+        """
+        Blocks until the next price/candle arrives.
+        Returns None on timeout, raises RuntimeError while the connection is down.
+        """
+        if not self._ready.wait(timeout):
+            if self.last_error is not None:
+                raise RuntimeError(f"ws feed down: {self.last_error}")
+            return None
+        self._ready.clear()
+        try:
+            return self._latest.pop()
+        except IndexError:  # schon abgeholt, Event kam nach dem pop
+            return None
+
+    def latest(self, timeout: float):
+        """
+        Newest trade price without consuming it (price mode: the engine keeps its own
+        interval_sec pace and samples the stream, instead of ticking on every trade).
+        Waits only until the first value arrives; None on timeout, raises RuntimeError
+        while the connection is down.
+        """
+        if self._last is None and not self._ready.wait(timeout):
+            if self.last_error is not None:
+                raise RuntimeError(f"ws feed down: {self.last_error}")
+            return None
+        if self.last_error is not None:
+            raise RuntimeError(f"ws feed down: {self.last_error}")
+        return self._last
+
+    def _push(self, item) -> None:
+        self._last = item
+        self._latest.append(item)  # neuester Wert gewinnt
+        self._ready.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with connect(self.url) as ws:
+                    self.last_error = None
+                    for msg in ws:
+                        self._on_message(json.loads(msg))
+            except Exception as e:
+                self.last_error = str(e)
+            time.sleep(self.reconnect_sec)
+
+    def _on_message(self, data: dict) -> None:
+        if self.interval is None:
+            self._push(float(data["p"]))
+            return
+
+        k = data["k"]
+        if not k["x"]:  # Kerze noch nicht abgeschlossen
+            return
+        self._push(Candle(
+            int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]), int(k["T"])
+        ))
@@ -0,0 +1,151 @@
+"""
+Checks that backtest mode reproduces the live loop's trades: runs engine.main once in
+"backtest" mode and once in "paper" mode (simulated clock, REST candle polling) over the
+same synthetic klines around several UTC midnights, and compares the trade lists.
+Usage: python scripts/check_backtest_parity.py   (exit status 1 on any mismatch)
+"""
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine.main as engine_main
+from engine.marketdata import Candle, interval_ms
+
+INTERVAL = "5m"
+DAYS = 4
+START_MS = 1_700_006_400_000 - 3_600_000  # 1h vor einer UTC-Mitternacht
+
+STRATEGIES = {
+    "ema_cross": {"name": "ema_cross", "ema_fast": 5, "ema_slow": 13, "stop_loss_pct": 0.4, "max_hold_candles": 20},
+    "trend_pullback": {
+        "name": "trend_pullback", "ema_trend": 50, "ema_pullback_fast": 8, "ema_pullback_slow": 20,
+        "pullback_band_pct": 0.01, "swing_lookback": 5, "rr_takeprofit": 1.5, "max_hold_candles": 15,
+    },
+}
+GATES = [(1, 100.0), (2, 100.0), (3, 0.5)]  # (max_trades_per_day, max_daily_loss_pct)
+
+
+class _Done(BaseException):
+    """Alle Kerzen verarbeitet (BaseException: main() faengt Exception pro Tick ab)."""
+
+
+class SimClock:
+    """time.time/time_ns/monotonic/sleep on one simulated ns counter."""
+
+    def __init__(self, ns: int):
+        self.ns = ns
+
+    def time(self) -> float:
+        return self.ns / 1e9
+
+    def time_ns(self) -> int:
+        return self.ns
+
+    def sleep(self, sec: float) -> None:
+        self.ns += int(sec * 1e9)
+
+
+def make_candles(seed: int) -> list[Candle]:
+    rnd = random.Random(seed)
+    iv = interval_ms(INTERVAL)
+    n = DAYS * 86_400_000 // iv
+    candles = []
+    price = 100.0
+    for k in range(n):
+        o = price
+        price += 0.4 * math.sin(k / 9.0) + rnd.gauss(0.0, 0.35)
+        open_time = START_MS + k * iv
+        candles.append(Candle(
+            open_time, o, max(o, price) + rnd.random() * 0.2, min(o, price) - rnd.random() * 0.2, price, 1.0,
+            open_time + iv - 1
+        ))
+    return candles
+
+
+def run_engine(mode: str, overrides: dict, candles: list[Candle], workdir: str) -> list[tuple]:
+    """Runs engine.main in `mode`; returns [(entry_price, exit_price, pnl, reason)] from the log."""
+    os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+    with open(os.path.join(workdir, "config", "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "mode": mode,
+            "symbols": ["BTCUSDT"],
+            "interval_sec": 10,
+            "trade_enabled": True,
+            **overrides,
+        }, f)
+    log_path = os.path.join(workdir, engine_main.LOG_PATHS["jsonl"])
+    if os.path.exists(log_path):
+        os.remove(log_path)
+
+    iv = interval_ms(INTERVAL)
+    clock = SimClock((candles[0].close_time + 1) * 1_000_000 + 750_000_000)
+
+    def last_closed(symbol: str, interval: str = "1m") -> Candle:
+        k = (clock.ns // 1_000_000 - candles[0].close_time - 1) // iv  # letzte Kerze mit close_time < jetzt
+        if k >= len(candles):
+            raise _Done()
+        return candles[k]
+
+    patched = {
+        (time, "time"): clock.time,
+        (time, "time_ns"): clock.time_ns,
+        (time, "monotonic"): clock.time,
+        (time, "sleep"): clock.sleep,
+        (engine_main, "get_binance_last_closed_candle"): last_closed,
+        (engine_main, "get_binance_closed_candles"): lambda symbol, interval="1m", limit=500: candles[-limit:],
+    }
+    saved = {key: getattr(*key) for key in patched}
+    cwd = os.getcwd()
+    try:
+        for (obj, name), value in patched.items():
+            setattr(obj, name, value)
+        os.chdir(workdir)
+        try:
+            engine_main.main()
+        except _Done:
+            pass
+    finally:
+        for (obj, name), value in saved.items():
+            setattr(obj, name, value)
+        os.chdir(cwd)
+        engine_main.close_log()
+
+    event_type = "backtest_trade" if mode == "backtest" else "position_closed"
+    with open(log_path, "rb") as f:
+        events = [json.loads(line) for line in f]
+    return [
+        (e["entry_price"], e["exit_price"], e["pnl"], e["reason"])
+        for e in events if e["type"] == event_type
+    ]
+
+
+def main() -> None:
+    failed = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for seed in range(2):
+            candles = make_candles(seed)
+            for name, strategy in STRATEGIES.items():
+                for max_trades, max_loss in GATES:
+                    overrides = {
+                        "max_trades_per_day": max_trades,
+                        "max_daily_loss_pct": max_loss,
+                        "strategy": {**strategy, "use_candles": True, "candle_interval": INTERVAL},
+                        "backtest_candles": len(candles),
+                    }
+                    bt = run_engine("backtest", overrides, candles, workdir)
+                    live = run_engine("paper", overrides, candles, workdir)
+                    ok = bt == live
+                    failed += not ok
+                    print(f"{'ok  ' if ok else 'DIFF'} seed={seed} {name} max_trades={max_trades} "
+                          f"max_daily_loss_pct={max_loss}: {len(bt)} backtest / {len(live)} live trades")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Prints a framed MessagePack engine log (log_format "msgpack") as JSONL.
+Usage: python scripts/dump_log.py [logs/engine.mp] > engine.jsonl
+"""
+import json
+import sys
+
+import msgpack
+
+
+def read_events(path: str):
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(4)
+            if len(head) < 4:
+                return
+            n = int.from_bytes(head, "little")
+            payload = f.read(n)
+            if len(payload) < n:  # abgeschnittener letzter Record (Crash beim Schreiben)
+                return
+            yield msgpack.unpackb(payload, raw=False)
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else "logs/engine.mp"
+    out = sys.stdout
+    for event in read_events(path):
+        out.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()